@@ -0,0 +1,126 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Compares query latency and resident memory of the Chroma store against the
+# in-process VectorIndex on the policy PDF chunks. Embeddings are generated
+# locally so no API calls are made. Run from the project root:
+#   python -m benchmarks.vector_backends --chunks 500 --queries 1000
+
+PDF_PATH = os.path.join(os.path.dirname(__file__), "..", "resources", "leave.pdf")
+
+
+class HashEmbeddings(Embeddings):
+    def __init__(self, dim: int = 1536):
+        self.dim = dim
+
+    def _embed(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def load_chunks(count: int):
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splits = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=50).split_documents(
+        PyPDFLoader(PDF_PATH).load()
+    )
+    chunks = []
+    while len(chunks) < count:
+        for doc in splits[:count - len(chunks)]:
+            doc = doc.model_copy()
+            doc.page_content = f"{doc.page_content} [{len(chunks)}]"
+            chunks.append(doc)
+    return chunks
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build(backend: str, directory: str, chunks, embedding):
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+
+        Chroma.from_documents(documents=chunks, embedding=embedding, persist_directory=directory)
+    else:
+        from vector_index import write_vector_index
+
+        write_vector_index(directory, chunks, embedding, quantize=backend == "numpy-int8")
+
+
+def measure(backend: str, directory: str, queries: int, k: int, result_queue):
+    embedding = HashEmbeddings()
+    query_vectors = [embedding.embed_query(f"leave request {i}") for i in range(queries)]
+    rss_before = rss_mb()
+
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+
+        store = Chroma(persist_directory=directory, embedding_function=embedding)
+        search = lambda vector: store.similarity_search_by_vector(vector, k=k)
+    else:
+        from vector_index import VectorIndex
+
+        index = VectorIndex(directory)
+        search = lambda vector: index.search(vector, k)
+
+    search(query_vectors[0])
+    latencies = []
+    for vector in query_vectors:
+        started = time.perf_counter()
+        search(vector)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    result_queue.put({
+        "backend": backend,
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 3),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Chroma against the in-process vector index.")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy", "numpy-int8"])
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    chunks = load_chunks(args.chunks)
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in args.backends:
+            directory = os.path.join(workdir, backend)
+            build(backend, directory, chunks, HashEmbeddings())
+            result_queue = context.Queue()
+            process = context.Process(target=measure, args=(backend, directory, args.queries, args.k, result_queue))
+            process.start()
+            result = result_queue.get()
+            process.join()
+            print(json.dumps({"chunks": len(chunks), **result}))
+
+
+if __name__ == "__main__":
+    main()
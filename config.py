@@ -13,3 +13,37 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 ACCESS_TOKEN_EXPIRE_DELTA = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+ADMIN_USERNAMES = {
+    username.strip()
+    for username in os.getenv("ADMIN_USERNAMES", "").split(",")
+    if username.strip()
+}
+
+LEAVE_BALANCE_CHUNK_SIZE = int(os.getenv("LEAVE_BALANCE_CHUNK_SIZE", 5000))
+
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", 10000))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 200))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", 1.0))
+AUDIT_WRITE_RETRIES = int(os.getenv("AUDIT_WRITE_RETRIES", 3))
+
+DEFAULT_POLICY_COLLECTION = os.getenv("DEFAULT_POLICY_COLLECTION", "langchain")
+POLICY_COLLECTION_CACHE_SIZE = int(os.getenv("POLICY_COLLECTION_CACHE_SIZE", 32))
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+VECTOR_INDEX_QUANTIZE = os.getenv("VECTOR_INDEX_QUANTIZE", "false").lower() in ("1", "true", "yes")
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", 30))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", 5))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 20))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 10))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 3))
+OPENAI_TOTAL_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TOTAL_TIMEOUT_SECONDS", 60))
+OPENAI_BACKOFF_BASE_SECONDS = float(os.getenv("OPENAI_BACKOFF_BASE_SECONDS", 0.5))
+OPENAI_BACKOFF_MAX_SECONDS = float(os.getenv("OPENAI_BACKOFF_MAX_SECONDS", 8))
+OPENAI_HEDGE_REQUESTS = os.getenv("OPENAI_HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes")
+OPENAI_HEDGE_MIN_SAMPLES = int(os.getenv("OPENAI_HEDGE_MIN_SAMPLES", 20))
+OPENAI_HEDGE_BUDGET = float(os.getenv("OPENAI_HEDGE_BUDGET", 0.1))
@@ -0,0 +1,236 @@
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import select
+from database import Base, engine, SessionLocal
+from models import LeaveDecisionAudit
+from config import AUDIT_BUFFER_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL_SECONDS, AUDIT_WRITE_RETRIES
+
+logger = logging.getLogger(__name__)
+
+audits = LeaveDecisionAudit.__table__
+
+
+def build_audit_entry(leave, evaluation: dict):
+    return {
+        "leave_id": leave.id,
+        "user_id": leave.user_id,
+        "created_at": datetime.utcnow(),
+        "leave_start_date": leave.leave_start_date,
+        "leave_day_count": leave.leave_day_count,
+        "leave_type": leave.leave_type,
+        "reason": leave.reason,
+        "decision": evaluation.get("output"),
+        "status": leave.status,
+        "explanation": evaluation.get("explanation"),
+        "answer": evaluation.get("answer"),
+        "context": json.dumps(evaluation.get("context", []), default=str),
+        "model": evaluation["model"],
+        "policy_collection": evaluation["policy_collection"],
+        "policy_version": evaluation["policy_version"],
+        "latency_ms": evaluation["latency_ms"],
+        "prompt_tokens": evaluation.get("prompt_tokens", 0),
+        "completion_tokens": evaluation.get("completion_tokens", 0),
+        "total_tokens": evaluation.get("total_tokens", 0),
+    }
+
+
+class DecisionAuditWriter:
+    # Write-behind buffer: the request path only does a non-blocking put, a
+    # daemon thread drains the queue and inserts entries in batches.
+
+    def __init__(
+        self,
+        buffer_size: int = AUDIT_BUFFER_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+        write_retries: int = AUDIT_WRITE_RETRIES,
+        bind=engine,
+    ):
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_retries = write_retries
+        self.bind = bind
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, entry: dict):
+        try:
+            self.buffer.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Decision audit buffer full, dropped entry for leave %s", entry.get("leave_id"))
+            return False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="decision-audit-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+    def stats(self):
+        return {
+            "buffered": self.buffer.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _drain(self, first=None):
+        batch = [] if first is None else [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.buffer.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, entries):
+        with self.bind.begin() as conn:
+            conn.execute(audits.insert(), entries)
+        self.written += len(entries)
+
+    def _write(self, batch):
+        # Transient errors (e.g. a locked SQLite database) are retried with
+        # backoff; if the batch still fails, entries are written one by one
+        # so a single bad entry does not take the rest of the batch with it.
+        for attempt in range(self.write_retries + 1):
+            try:
+                self._insert(batch)
+                return
+            except Exception:
+                if attempt == self.write_retries:
+                    logger.exception("Failed to write %d decision audit entries", len(batch))
+                else:
+                    time.sleep(min(0.1 * 2 ** attempt, self.flush_interval))
+        for entry in batch:
+            try:
+                self._insert([entry])
+            except Exception:
+                self.failed += 1
+                logger.exception("Dropped decision audit entry for leave %s", entry.get("leave_id"))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self.buffer.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            batch = self._drain(first)
+            while len(batch) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.buffer.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+
+audit_writer = DecisionAuditWriter()
+
+
+def replay_decisions(
+    policy_version: str = None,
+    since: datetime = None,
+    limit: int = None,
+    outdated_only: bool = False,
+    collection: str = None,
+    batch_size: int = 100,
+):
+    # By default each decision is replayed against its own collection as it
+    # is live now; passing a collection replays against that one instead,
+    # e.g. a candidate policy uploaded under a key no user is assigned to.
+    from rag_handler import evaluate_request
+    from vector_setup import get_policy_storage, policy_collection_exists
+
+    if collection and not policy_collection_exists(collection):
+        raise ValueError(f"Policy collection '{collection}' does not exist")
+
+    query = select(LeaveDecisionAudit).order_by(LeaveDecisionAudit.id)
+    if policy_version:
+        query = query.where(LeaveDecisionAudit.policy_version == policy_version)
+    if since:
+        query = query.where(LeaveDecisionAudit.created_at >= since)
+    if limit:
+        query = query.limit(limit)
+
+    db = SessionLocal()
+    try:
+        current_versions = {}
+        for audit in db.execute(query.execution_options(yield_per=batch_size)).scalars():
+            target = collection or audit.policy_collection
+            if outdated_only:
+                if target not in current_versions:
+                    current_versions[target] = get_policy_storage(target)[1]
+                if audit.policy_version == current_versions[target]:
+                    continue
+            replayed = evaluate_request(audit.reason, target)
+            yield {
+                "audit_id": audit.id,
+                "leave_id": audit.leave_id,
+                "policy_collection": audit.policy_collection,
+                "replayed_policy_collection": target,
+                "original_policy_version": audit.policy_version,
+                "replayed_policy_version": replayed["policy_version"],
+                "original_decision": audit.decision,
+                "replayed_decision": replayed["output"],
+                "changed": audit.decision != replayed["output"],
+                "replayed_explanation": replayed["explanation"],
+            }
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay audited leave decisions against the current or a candidate policy.")
+    parser.add_argument("--policy-version", help="Only replay decisions made under this policy version (upload hash)")
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--changed-only", action="store_true")
+    parser.add_argument(
+        "--outdated-only", action="store_true", help="Skip decisions already made under the policy upload being replayed"
+    )
+    parser.add_argument(
+        "--collection", help="Replay against this policy collection instead of each decision's own collection"
+    )
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    total = changed = 0
+    for result in replay_decisions(args.policy_version, args.since, args.limit, args.outdated_only, args.collection):
+        total += 1
+        changed += result["changed"]
+        if result["changed"] or not args.changed_only:
+            print(json.dumps(result, default=str))
+    print(json.dumps({"replayed": total, "changed": changed}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_BYTES
+
+# Vectors live in a fixed-size memory-mapped float32 file (one row per slot),
+# the key -> slot index and LRU timestamps live in SQLite. Readers copy rows
+# inside a read transaction and writers only touch the file while holding an
+# exclusive SQLite lock, so worker processes can share one cache directory.
+# The memmap writes are not part of the SQLite transaction, so every slot also
+# stores a digest of its key; a row whose digest does not match the index
+# (e.g. after a rolled-back eviction) is treated as a miss.
+
+SQLITE_MAX_VARIABLES = 500
+KEY_DIGEST_BYTES = 32
+
+
+def embedding_key(model: str, text: str):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _key_digest(key: str):
+    return np.frombuffer(hashlib.sha256(key.encode("utf-8")).digest(), dtype=np.uint8)
+
+
+class EmbeddingCache:
+    def __init__(self, directory: str, model: str, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.model = model
+        self.max_bytes = max_bytes
+        self.directory = os.path.join(directory, re.sub(r"[^a-zA-Z0-9._-]", "_", model))
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_path = os.path.join(self.directory, "index.sqlite3")
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.keys_path = os.path.join(self.directory, "keys.bin")
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._vectors = None
+        self._keys = None
+        self._vectors_lock = threading.Lock()
+
+        with self._transaction("IMMEDIATE") as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, slot INTEGER NOT NULL UNIQUE, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, mode: str = "DEFERRED"):
+        conn = self._connection()
+        conn.execute(f"BEGIN {mode}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _meta(self, conn):
+        return dict(conn.execute("SELECT name, value FROM meta").fetchall())
+
+    def _open_vectors(self, dim: int, capacity: int):
+        with self._vectors_lock:
+            if self._vectors is None:
+                for path, size in ((self.vectors_path, capacity * dim * 4), (self.keys_path, capacity * KEY_DIGEST_BYTES)):
+                    if not os.path.exists(path):
+                        with open(path, "wb") as f:
+                            f.truncate(size)
+                self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+                self._keys = np.memmap(self.keys_path, dtype=np.uint8, mode="r+", shape=(capacity, KEY_DIGEST_BYTES))
+            return self._vectors, self._keys
+
+    def get_many(self, keys: List[str]):
+        found = {}
+        with self._transaction() as conn:
+            meta = self._meta(conn)
+            if "dim" in meta:
+                vectors, slot_keys = self._open_vectors(meta["dim"], meta["capacity"])
+                for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                    batch = keys[start:start + SQLITE_MAX_VARIABLES]
+                    rows = conn.execute(
+                        f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+                    ).fetchall()
+                    for key, slot in rows:
+                        if np.array_equal(slot_keys[slot], _key_digest(key)):
+                            found[key] = np.array(vectors[slot])
+
+        if found:
+            try:
+                with self._transaction("IMMEDIATE") as conn:
+                    conn.executemany(
+                        "UPDATE entries SET last_access = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+            except sqlite3.OperationalError:
+                pass
+
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: dict):
+        if not items:
+            return
+        dim = len(next(iter(items.values())))
+        with self._transaction("EXCLUSIVE") as conn:
+            meta = self._meta(conn)
+            if "dim" not in meta:
+                capacity = max(1, self.max_bytes // (dim * 4))
+                conn.executemany(
+                    "INSERT INTO meta (name, value) VALUES (?, ?)", [("dim", dim), ("capacity", capacity)]
+                )
+                meta = {"dim": dim, "capacity": capacity}
+            if meta["dim"] != dim:
+                raise ValueError(f"Embedding dimension {dim} does not match cached dimension {meta['dim']}")
+            vectors, slot_keys = self._open_vectors(meta["dim"], meta["capacity"])
+
+            existing = {}
+            keys = list(items)
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                batch = keys[start:start + SQLITE_MAX_VARIABLES]
+                existing.update(
+                    conn.execute(f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch)
+                )
+
+            now = time.time()
+            # Indexed keys whose slot was overwritten by an aborted write are
+            # repaired in place.
+            stale = [(key, slot) for key, slot in existing.items() if not np.array_equal(slot_keys[slot], _key_digest(key))]
+            new_keys = [key for key in keys if key not in existing][:meta["capacity"]]
+            if not new_keys and not stale:
+                return
+
+            used = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            free_slots = list(range(used, min(used + len(new_keys), meta["capacity"])))
+            evict_count = len(new_keys) - len(free_slots)
+            if evict_count:
+                evicted = conn.execute(
+                    "SELECT key, slot FROM entries ORDER BY last_access LIMIT ?", (evict_count,)
+                ).fetchall()
+                conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+                free_slots += [slot for _, slot in evicted]
+
+            # The key digest goes in before the vector, so a slot is never
+            # attributed to its old key while holding the new vector.
+            written = stale + list(zip(new_keys, free_slots))
+            for key, slot in written:
+                slot_keys[slot] = _key_digest(key)
+                vectors[slot] = items[key]
+            slot_keys.flush()
+            vectors.flush()
+            conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?", [(now, key) for key, _ in stale])
+            conn.executemany(
+                "INSERT INTO entries (key, slot, last_access) VALUES (?, ?, ?)",
+                [(key, slot, now) for key, slot in zip(new_keys, free_slots)],
+            )
+
+    def stats(self):
+        conn = self._connection()
+        meta = self._meta(conn)
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        vector_bytes = meta.get("dim", 0) * 4
+        max_bytes = meta["capacity"] * vector_bytes if "dim" in meta else self.max_bytes
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": entries,
+            "bytes_used": entries * vector_bytes,
+            "max_bytes": max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_key(self.cache.model, text) for text in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, vectors)}
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model: str, directory: str = EMBEDDING_CACHE_DIR):
+    with _caches_lock:
+        if (directory, model) not in _caches:
+            _caches[(directory, model)] = EmbeddingCache(directory, model)
+        return _caches[(directory, model)]
+
+
+def get_embedding_cache_stats():
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
@@ -0,0 +1,320 @@
+import argparse
+import json
+from datetime import date, datetime
+from sqlalchemy import case, func, select, update, or_
+from database import Base, engine
+from models import RemainingLeaveCount, LeaveBalanceJob, User
+from config import LEAVE_BALANCE_CHUNK_SIZE
+
+# Rollover and accrual run as set-based UPDATEs over keyset chunks of
+# remaining_leave_counts.user_id. Each chunk commits together with the job
+# checkpoint, so a failed run resumes from the last committed chunk and no
+# user is ever rolled over twice for the same job key.
+
+balances = RemainingLeaveCount.__table__
+jobs = LeaveBalanceJob.__table__
+
+LEAVE_BALANCE_COLUMNS = {
+    "Sick": "sick_leaves",
+    "Casual": "casual_leaves",
+    "Annual": "annual_leaves",
+    "Other": "other_leaves",
+}
+
+DEFAULT_ENTITLEMENTS = {
+    leave_type: balances.c[column].default.arg
+    for leave_type, column in LEAVE_BALANCE_COLUMNS.items()
+}
+
+DEFAULT_CARRY_OVER_CAPS = {
+    "Sick": 0,
+    "Casual": 0,
+    "Annual": 5,
+    "Other": 0,
+}
+
+DRY_RUN_SAMPLE_SIZE = 20
+
+
+def _validate_rules(rules: dict, name: str, allow_none: bool = False):
+    for leave_type, value in rules.items():
+        if leave_type not in LEAVE_BALANCE_COLUMNS:
+            raise ValueError(f"Invalid leave type in {name}: {leave_type}")
+        if value is None and not allow_none:
+            raise ValueError(f"{name} for {leave_type} must be a number")
+        if value is not None and value < 0:
+            raise ValueError(f"{name} for {leave_type} must not be negative")
+
+
+def rollover_rules(entitlements: dict = None, carry_over_caps: dict = None):
+    rules = {
+        "entitlements": {**DEFAULT_ENTITLEMENTS, **(entitlements or {})},
+        "carry_over_caps": {**DEFAULT_CARRY_OVER_CAPS, **(carry_over_caps or {})},
+    }
+    _validate_rules(rules["entitlements"], "entitlements")
+    _validate_rules(rules["carry_over_caps"], "carry_over_caps", allow_none=True)
+    return rules
+
+
+def accrual_rules(amounts: dict, max_balances: dict = None):
+    rules = {
+        "amounts": {leave_type: amount for leave_type, amount in (amounts or {}).items() if amount != 0},
+        "max_balances": dict(max_balances or {}),
+    }
+    _validate_rules(rules["amounts"], "amounts")
+    _validate_rules(rules["max_balances"], "max_balances", allow_none=True)
+    if not rules["amounts"]:
+        raise ValueError("At least one positive accrual amount is required")
+    return rules
+
+
+def rollover_assignments(rules: dict):
+    assignments = {}
+    for leave_type, column_name in LEAVE_BALANCE_COLUMNS.items():
+        column = balances.c[column_name]
+        cap = rules["carry_over_caps"][leave_type]
+        carried = column if cap is None else case((column > cap, cap), else_=column)
+        assignments[column_name] = carried + rules["entitlements"][leave_type]
+    return assignments
+
+
+def accrual_assignments(rules: dict):
+    assignments = {}
+    for leave_type, amount in rules["amounts"].items():
+        column = balances.c[LEAVE_BALANCE_COLUMNS[leave_type]]
+        maximum = rules["max_balances"].get(leave_type)
+        if maximum is None:
+            assignments[column.name] = column + amount
+        else:
+            assignments[column.name] = case(
+                (column >= maximum, column),
+                (column + amount > maximum, maximum),
+                else_=column + amount,
+            )
+    return assignments
+
+
+ASSIGNMENT_BUILDERS = {
+    "Rollover": rollover_assignments,
+    "Accrual": accrual_assignments,
+}
+
+
+def _chunk_upper_bound(conn, after_user_id: int, chunk_size: int):
+    chunk = (
+        select(balances.c.user_id)
+        .where(balances.c.user_id > after_user_id)
+        .order_by(balances.c.user_id)
+        .limit(chunk_size)
+        .subquery()
+    )
+    return conn.execute(select(func.max(chunk.c.user_id))).scalar()
+
+
+def _changed_filter(assignments: dict):
+    return or_(*(balances.c[name] != expression for name, expression in assignments.items()))
+
+
+def preview_balance_job(assignments: dict, after_user_id: int = 0, sample_size: int = DRY_RUN_SAMPLE_SIZE, bind=engine):
+    scope = balances.c.user_id > after_user_id
+    totals = []
+    for name, expression in assignments.items():
+        totals += [
+            func.coalesce(func.sum(balances.c[name]), 0).label(f"{name}_before"),
+            func.coalesce(func.sum(expression), 0).label(f"{name}_after"),
+            func.count(case((balances.c[name] != expression, 1))).label(f"{name}_changed"),
+        ]
+
+    sample_columns = [balances.c.user_id, User.__table__.c.username]
+    for name, expression in assignments.items():
+        sample_columns += [balances.c[name].label(f"{name}_before"), expression.label(f"{name}_after")]
+
+    with bind.connect() as conn:
+        aggregate = conn.execute(
+            select(func.count().label("users"), *totals).select_from(balances).where(scope)
+        ).mappings().one()
+        sample = conn.execute(
+            select(*sample_columns)
+            .select_from(balances.join(User.__table__, User.__table__.c.id == balances.c.user_id))
+            .where(scope, _changed_filter(assignments))
+            .order_by(balances.c.user_id)
+            .limit(sample_size)
+        ).mappings().all()
+
+    return {
+        "users": aggregate["users"],
+        "columns": {
+            name: {
+                "total_before": aggregate[f"{name}_before"],
+                "total_after": aggregate[f"{name}_after"],
+                "users_changed": aggregate[f"{name}_changed"],
+            }
+            for name in assignments
+        },
+        "sample": [dict(row) for row in sample],
+    }
+
+
+def _job_summary(job, chunks: int = 0):
+    return {
+        "job_key": job["job_key"],
+        "job_type": job["job_type"],
+        "rules": json.loads(job["rules"]),
+        "status": job["status"],
+        "last_user_id": job["last_user_id"],
+        "rows_updated": job["rows_updated"],
+        "chunks": chunks,
+    }
+
+
+def _load_job(conn, job_key: str):
+    return conn.execute(select(jobs).where(jobs.c.job_key == job_key)).mappings().first()
+
+
+def run_balance_job(
+    job_key: str,
+    job_type: str,
+    rules: dict,
+    chunk_size: int = LEAVE_BALANCE_CHUNK_SIZE,
+    dry_run: bool = False,
+    bind=engine,
+):
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be greater than 0")
+    assignments = ASSIGNMENT_BUILDERS[job_type](rules)
+    rules_json = json.dumps(rules, sort_keys=True)
+
+    with bind.begin() as conn:
+        job = _load_job(conn, job_key)
+        if job and job["job_type"] != job_type:
+            raise ValueError(f"Job {job_key} already exists as a {job['job_type']} job")
+        # A job key is bound to the rules it was started with, so a resumed
+        # run can never apply different rules to the remaining users.
+        if job and json.loads(job["rules"]) != json.loads(rules_json):
+            raise ValueError(f"Job {job_key} was started with different rules: {job['rules']}")
+        if job and job["status"] == "Completed":
+            return _job_summary(job)
+
+        if dry_run:
+            summary = _job_summary(job) if job else {
+                "job_key": job_key,
+                "job_type": job_type,
+                "rules": rules,
+                "status": "Not started",
+                "last_user_id": 0,
+                "rows_updated": 0,
+                "chunks": 0,
+            }
+            after_user_id = summary["last_user_id"]
+        elif not job:
+            conn.execute(jobs.insert().values(job_key=job_key, job_type=job_type, rules=rules_json))
+
+    if dry_run:
+        summary["dry_run"] = True
+        summary["diff"] = preview_balance_job(assignments, after_user_id=after_user_id, bind=bind)
+        return summary
+
+    chunks = 0
+    while True:
+        with bind.begin() as conn:
+            job = _load_job(conn, job_key)
+            last_user_id = job["last_user_id"]
+            upper_bound = _chunk_upper_bound(conn, last_user_id, chunk_size)
+
+            if upper_bound is None:
+                conn.execute(
+                    update(jobs)
+                    .where(jobs.c.id == job["id"])
+                    .values(status="Completed", finished_at=datetime.utcnow())
+                )
+                break
+
+            result = conn.execute(
+                update(balances)
+                .where(balances.c.user_id > last_user_id, balances.c.user_id <= upper_bound)
+                .values(**assignments)
+            )
+            checkpoint = conn.execute(
+                update(jobs)
+                .where(jobs.c.id == job["id"], jobs.c.last_user_id == last_user_id)
+                .values(last_user_id=upper_bound, rows_updated=jobs.c.rows_updated + result.rowcount)
+            )
+            if checkpoint.rowcount != 1:
+                raise RuntimeError(f"Job {job_key} was advanced by another runner")
+            chunks += 1
+
+    with bind.connect() as conn:
+        return _job_summary(_load_job(conn, job_key), chunks)
+
+
+def run_rollover(job_key: str, entitlements: dict = None, carry_over_caps: dict = None, **kwargs):
+    return run_balance_job(job_key, "Rollover", rollover_rules(entitlements, carry_over_caps), **kwargs)
+
+
+def run_accrual(job_key: str, amounts: dict, max_balances: dict = None, **kwargs):
+    return run_balance_job(job_key, "Accrual", accrual_rules(amounts, max_balances), **kwargs)
+
+
+def _rule(value: str, allow_none: bool = False):
+    leave_type, _, amount = value.partition("=")
+    if amount.lower() == "none" and allow_none:
+        return leave_type, None
+    try:
+        return leave_type, int(amount)
+    except ValueError:
+        expected = "TYPE=N or TYPE=none" if allow_none else "TYPE=N"
+        raise argparse.ArgumentTypeError(f"expected {expected}, got {value!r}")
+
+
+def _optional_rule(value: str):
+    return _rule(value, allow_none=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run yearly leave balance rollover or accrual jobs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rollover = subparsers.add_parser("rollover", help="Reset balances to entitlements plus capped carry-over")
+    rollover.add_argument("--job-key", default=f"rollover-{date.today().year}")
+    rollover.add_argument(
+        "--cap", action="append", type=_optional_rule, metavar="TYPE=N", help="Carry-over cap, or TYPE=none for no cap"
+    )
+    rollover.add_argument(
+        "--entitlement", action="append", type=_rule, metavar="TYPE=N", help="Yearly entitlement per leave type"
+    )
+
+    accrue = subparsers.add_parser("accrue", help="Add accrued days to balances")
+    accrue.add_argument("--job-key", required=True)
+    accrue.add_argument("--amount", action="append", type=_rule, metavar="TYPE=N", required=True)
+    accrue.add_argument(
+        "--max-balance", action="append", type=_optional_rule, metavar="TYPE=N", help="Balance cap, or TYPE=none"
+    )
+
+    for subparser in (rollover, accrue):
+        subparser.add_argument("--chunk-size", type=int, default=LEAVE_BALANCE_CHUNK_SIZE)
+        subparser.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+
+    if args.command == "rollover":
+        result = run_rollover(
+            args.job_key,
+            entitlements=dict(args.entitlement or []),
+            carry_over_caps=dict(args.cap or []),
+            chunk_size=args.chunk_size,
+            dry_run=args.dry_run,
+        )
+    else:
+        result = run_accrual(
+            args.job_key,
+            amounts=dict(args.amount),
+            max_balances=dict(args.max_balance or []),
+            chunk_size=args.chunk_size,
+            dry_run=args.dry_run,
+        )
+    print(json.dumps(result, indent=4, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import date
+from sqlalchemy import select
+from database import SessionLocal
+from models import Leave, User
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_COLUMNS = [
+    "leave_id",
+    "user_id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "leave_start_date",
+    "leave_day_count",
+    "leave_type",
+    "status",
+    "reason",
+    "explanation",
+]
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def build_export_query(start_date: date = None, end_date: date = None, status: str = None, leave_type: str = None):
+    query = (
+        select(
+            Leave.id.label("leave_id"),
+            User.id.label("user_id"),
+            User.username,
+            User.email,
+            User.first_name,
+            User.last_name,
+            Leave.leave_start_date,
+            Leave.leave_day_count,
+            Leave.leave_type,
+            Leave.status,
+            Leave.reason,
+            Leave.explanation,
+        )
+        .join(User, User.id == Leave.user_id)
+        .order_by(Leave.id)
+    )
+    if start_date:
+        query = query.where(Leave.leave_start_date >= start_date)
+    if end_date:
+        query = query.where(Leave.leave_start_date <= end_date)
+    if status:
+        query = query.where(Leave.status == status)
+    if leave_type:
+        query = query.where(Leave.leave_type == leave_type)
+    return query
+
+
+def iter_export_batches(batch_size: int = EXPORT_BATCH_SIZE, **filters):
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            build_export_query(**filters).execution_options(stream_results=True, yield_per=batch_size)
+        )
+        for partition in result.mappings().partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(row), default=str) + "\n" for row in rows).encode("utf-8")
+
+
+class _ChunkSink:
+    # Write-only file object for ParquetWriter: tell() keeps counting across
+    # drained chunks so footer offsets stay correct.
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_chunks(batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("leave_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("username", pa.string()),
+        ("email", pa.string()),
+        ("first_name", pa.string()),
+        ("last_name", pa.string()),
+        ("leave_start_date", pa.date32()),
+        ("leave_day_count", pa.int32()),
+        ("leave_type", pa.string()),
+        ("status", pa.string()),
+        ("reason", pa.string()),
+        ("explanation", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for rows in batches:
+            writer.write_table(pa.Table.from_pylist([dict(row) for row in rows], schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_leaves(export_format: str = "csv", batch_size: int = EXPORT_BATCH_SIZE, **filters):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export requires the pyarrow package.")
+
+    batches = iter_export_batches(batch_size=batch_size, **filters)
+    if export_format == "csv":
+        return _csv_chunks(batches)
+    if export_format == "ndjson":
+        return _ndjson_chunks(batches)
+    return _parquet_chunks(batches)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export leave records joined with user details for payroll.")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--output", help="Output file path, defaults to stdout")
+    parser.add_argument("--start-date", type=date.fromisoformat)
+    parser.add_argument("--end-date", type=date.fromisoformat)
+    parser.add_argument("--status")
+    parser.add_argument("--leave-type")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    chunks = export_leaves(
+        args.format,
+        batch_size=args.batch_size,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        status=args.status,
+        leave_type=args.leave_type,
+    )
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
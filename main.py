@@ -1,13 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from database import Base, engine
 from routes import router
+from decision_audit import audit_writer
 
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    audit_writer.start()
+    yield
+    audit_writer.stop()
+
 app = FastAPI(
     title="Leave Management System API",
     description="An API for managing user registrations, leave requests, and policy management.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, Enum, CheckConstraint
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Float, Text, Enum, CheckConstraint, func
 from database import Base
 from sqlalchemy.orm import relationship
 
@@ -61,4 +61,65 @@ class Leave(Base):
             "leave_type IN ('Sick', 'Casual', 'Annual', 'Other')",
             name="valid_leave_type"
         ),
-    )
\ No newline at end of file
+    )
+
+class UserPolicyAssignment(Base):
+    __tablename__ = "user_policy_assignments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+    policy_collection = Column(String(63), nullable=False, index=True)
+
+    user = relationship("User")
+
+class PolicyCollection(Base):
+    __tablename__ = "policy_collections"
+
+    id = Column(Integer, primary_key=True, index=True)
+    collection_key = Column(String(63), unique=True, nullable=False, index=True)
+    storage_name = Column(String(63), nullable=False)
+    version = Column(String(64), nullable=False)
+    uploaded_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class LeaveBalanceJob(Base):
+    __tablename__ = "leave_balance_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_key = Column(String(100), unique=True, nullable=False, index=True)
+    job_type = Column(String(20), nullable=False)
+    rules = Column(Text, nullable=False)
+    status = Column(String(20), default="Running", nullable=False)
+    last_user_id = Column(Integer, default=0, nullable=False)
+    rows_updated = Column(Integer, default=0, nullable=False)
+    started_at = Column(DateTime, server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        CheckConstraint("job_type IN ('Rollover', 'Accrual')", name="valid_job_type"),
+        CheckConstraint("status IN ('Running', 'Completed')", name="valid_job_status"),
+    )
+
+
+class LeaveDecisionAudit(Base):
+    __tablename__ = "leave_decision_audits"
+
+    id = Column(Integer, primary_key=True, index=True)
+    leave_id = Column(Integer, ForeignKey("leaves.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    leave_start_date = Column(Date, nullable=False)
+    leave_day_count = Column(Integer, nullable=False)
+    leave_type = Column(String, nullable=False)
+    reason = Column(String, nullable=False)
+    decision = Column(String)
+    status = Column(String, nullable=False)
+    explanation = Column(String)
+    answer = Column(Text)
+    context = Column(Text, nullable=False)
+    model = Column(String, nullable=False)
+    policy_collection = Column(String, nullable=False)
+    policy_version = Column(String, nullable=False, index=True)
+    latency_ms = Column(Float, nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    total_tokens = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,293 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from embedding_cache import CachedEmbeddings, get_embedding_cache
+from config import (
+    EMBEDDING_CACHE_ENABLED,
+    OPENAI_TIMEOUT_SECONDS,
+    OPENAI_CONNECT_TIMEOUT_SECONDS,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_MAX_RETRIES,
+    OPENAI_TOTAL_TIMEOUT_SECONDS,
+    OPENAI_BACKOFF_BASE_SECONDS,
+    OPENAI_BACKOFF_MAX_SECONDS,
+    OPENAI_HEDGE_REQUESTS,
+    OPENAI_HEDGE_MIN_SAMPLES,
+    OPENAI_HEDGE_BUDGET,
+)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+LATENCY_WINDOW = 200
+HEDGE_BURST = 10
+
+
+class ClientMetrics:
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.retries_exhausted = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated = 0
+
+    def request_started(self):
+        with self._lock:
+            self.requests += 1
+            if self.in_flight >= self.max_connections:
+                self.saturated += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self, endpoint: str, latency: float = None):
+        with self._lock:
+            self.in_flight -= 1
+            if latency is None:
+                self.errors += 1
+            else:
+                self._latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def p95(self, endpoint: str, min_samples: int = 1):
+        # Chat completions and embeddings have very different latency
+        # profiles, so each endpoint gets its own window.
+        with self._lock:
+            window = self._latencies.get(endpoint, ())
+            if len(window) < max(min_samples, 1):
+                return None
+            latencies = sorted(window)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = list(self._latencies)
+        p95 = {endpoint: self.p95(endpoint) * 1000 for endpoint in endpoints}
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "retries_exhausted": self.retries_exhausted,
+                "hedges_sent": self.hedges_sent,
+                "hedges_won": self.hedges_won,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "max_connections": self.max_connections,
+                "pool_saturated_requests": self.saturated,
+                "p95_latency_ms": p95,
+            }
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class ResilientTransport(httpx.BaseTransport):
+    # Wraps the pooled transport with exponential-backoff retries on 429/5xx
+    # and connection errors, and optionally hedges a second request once the
+    # first one is slower than the observed p95 latency. All attempts of one
+    # request share a single deadline, so retries never outlive the caller.
+    # Each request earns a fraction of a hedge (up to a small burst) and the
+    # pool must have spare connections, so hedging cannot double the load
+    # when the upstream is slow across the board.
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        metrics: ClientMetrics,
+        max_retries: int = OPENAI_MAX_RETRIES,
+        total_timeout: float = OPENAI_TOTAL_TIMEOUT_SECONDS,
+        backoff_base: float = OPENAI_BACKOFF_BASE_SECONDS,
+        backoff_max: float = OPENAI_BACKOFF_MAX_SECONDS,
+        hedge: bool = OPENAI_HEDGE_REQUESTS,
+        hedge_min_samples: int = OPENAI_HEDGE_MIN_SAMPLES,
+        hedge_budget: float = OPENAI_HEDGE_BUDGET,
+    ):
+        self.transport = transport
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.total_timeout = total_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_budget = hedge_budget
+        self._hedge_tokens = 0.0
+        self._hedge_lock = threading.Lock()
+        # Primaries and hedges both run on the pool, so it must not be the
+        # bottleneck in front of the connection limit.
+        self._executor = (
+            ThreadPoolExecutor(max_workers=2 * metrics.max_connections, thread_name_prefix="openai-hedge")
+            if hedge else None
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        deadline = time.monotonic() + self.total_timeout
+        timeouts = dict(request.extensions.get("timeout", {}))
+        attempt = 0
+        while True:
+            self._limit_timeouts(request, timeouts, deadline)
+            retry_after = None
+            try:
+                response = self._send_hedged(request, deadline) if self.hedge else self._send(request)
+            except httpx.TransportError:
+                delay = self._backoff(attempt + 1)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.metrics.increment("retries_exhausted")
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                delay = self._backoff(attempt + 1, response.headers.get("retry-after"))
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.metrics.increment("retries_exhausted")
+                    return response
+                response.close()
+
+            attempt += 1
+            self.metrics.increment("retries")
+            time.sleep(delay)
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+        self.transport.close()
+
+    def _limit_timeouts(self, request: httpx.Request, timeouts: dict, deadline: float):
+        remaining = max(deadline - time.monotonic(), 0.001)
+        request.extensions["timeout"] = {
+            name: remaining if value is None else min(value, remaining) for name, value in timeouts.items()
+        }
+
+    def _backoff(self, attempt: int, retry_after: str = None):
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.backoff_max)
+        except ValueError:
+            pass
+        delay = min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max)
+        return random.uniform(delay / 2, delay)
+
+    def _send(self, request: httpx.Request):
+        self.metrics.request_started()
+        started = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+        except Exception:
+            self.metrics.request_finished(request.url.path)
+            raise
+        self.metrics.request_finished(request.url.path, time.perf_counter() - started)
+        return response
+
+    def _take_hedge_token(self):
+        with self._hedge_lock:
+            if self.metrics.in_flight >= self.metrics.max_connections or self._hedge_tokens < 1:
+                return False
+            self._hedge_tokens -= 1
+            return True
+
+    def _send_hedged(self, request: httpx.Request, deadline: float):
+        with self._hedge_lock:
+            self._hedge_tokens = min(self._hedge_tokens + self.hedge_budget, HEDGE_BURST)
+        hedge_after = self.metrics.p95(request.url.path, self.hedge_min_samples)
+        if hedge_after is None or time.monotonic() + hedge_after >= deadline:
+            return self._send(request)
+
+        primary = self._executor.submit(self._send, request)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        pending = {primary}
+        hedge = None
+        if self._take_hedge_token():
+            self.metrics.increment("hedges_sent")
+            hedge = self._executor.submit(self._send, request)
+            pending.add(hedge)
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.add_done_callback(_close_response)
+                raise httpx.TimeoutException("OpenAI request deadline exceeded", request=request)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                for other in pending:
+                    other.add_done_callback(_close_response)
+                for other in done - {future}:
+                    _close_response(other)
+                if future is hedge:
+                    self.metrics.increment("hedges_won")
+                return future.result()
+        raise error
+
+
+metrics = ClientMetrics(OPENAI_MAX_CONNECTIONS)
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            transport = httpx.HTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            )
+            _http_client = httpx.Client(
+                transport=ResilientTransport(transport, metrics),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+            )
+        return _http_client
+
+
+def get_chat_model(model_name: str = "gpt-3.5-turbo", temperature: float = 0, timeout: float = OPENAI_TIMEOUT_SECONDS):
+    return ChatOpenAI(
+        model_name=model_name,
+        temperature=temperature,
+        http_client=get_http_client(),
+        request_timeout=httpx.Timeout(timeout, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+        max_retries=0,
+    )
+
+
+def get_embeddings(
+    model: str = "text-embedding-3-small",
+    timeout: float = OPENAI_TIMEOUT_SECONDS,
+    cached: bool = EMBEDDING_CACHE_ENABLED,
+):
+    embeddings = OpenAIEmbeddings(
+        model=model,
+        http_client=get_http_client(),
+        request_timeout=httpx.Timeout(timeout, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+        max_retries=0,
+    )
+    if cached:
+        return CachedEmbeddings(embeddings, get_embedding_cache(model))
+    return embeddings
+
+
+def get_client_metrics():
+    return metrics.snapshot()
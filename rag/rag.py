@@ -1,13 +1,13 @@
 import os
 import json
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.vectorstores import Chroma
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
+from openai_client import get_chat_model, get_embeddings
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -25,7 +25,7 @@ def initialize_rag_pipeline(pdf_path):
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=50)
     splits = text_splitter.split_documents(docs)
 
-    embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
+    embedding_model = get_embeddings("text-embedding-3-small")
     vectorstore = Chroma.from_documents(documents=splits, embedding=embedding_model)
 
     retriever = vectorstore.as_retriever()
@@ -49,7 +49,7 @@ def initialize_rag_pipeline(pdf_path):
         ]
     )
 
-    llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
+    llm = get_chat_model("gpt-3.5-turbo", temperature=0)
     qa_chain = create_stuff_documents_chain(llm, prompt)
     rag_chain = create_retrieval_chain(retriever, qa_chain)
 
@@ -83,7 +83,7 @@ def handle_request(rag_chain, leave_request):
 
 
 if __name__ == "__main__":
-    # Only executes if the script is run directly
+    # Only executes if the script is run directly, e.g. `python -m rag.rag` from the project root
     pdf_path = "D:/Projects/RAG Assignment/resources/leave.pdf"  # Update the path as needed
     leave_request = "I face an accident."
 
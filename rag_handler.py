@@ -1,12 +1,22 @@
 import os
 import json
+import time
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_community.callbacks import get_openai_callback
+try:
+    from chromadb.errors import NotFoundError as CollectionNotFoundError
+except ImportError:
+    from chromadb.errors import InvalidCollectionException as CollectionNotFoundError
+from vector_setup import persist_directory, vector_index_path, get_policy_storage
+from config import DEFAULT_POLICY_COLLECTION, POLICY_COLLECTION_CACHE_SIZE, VECTOR_BACKEND
+from vector_index import VectorIndex, VectorIndexRetriever
+from openai_client import get_chat_model, get_embeddings
 
 load_dotenv()
 
@@ -16,12 +26,8 @@ if not openai_api_key:
 
 os.environ["OPENAI_API_KEY"] = openai_api_key
 
-persist_directory = "vectorstore_data"
-embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
-
-vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embedding_model)
-
-retriever = vectorstore.as_retriever()
+model_name = "gpt-3.5-turbo"
+embedding_model = get_embeddings("text-embedding-3-small")
 
 system_prompt = (
     "You are the head of the HR department. You are responsible for approving or rejecting leave requests based on company policies. "
@@ -42,15 +48,64 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
+llm = get_chat_model(model_name, temperature=0)
 qa_chain = create_stuff_documents_chain(llm, prompt)
-rag_chain = create_retrieval_chain(retriever, qa_chain)
 
-def handle_request(leave_request: str):
-    response = rag_chain.invoke({"input": leave_request})
+# Retrieval chains per policy collection, least recently used first. Only
+# the most recently used collections stay open. Each entry remembers the
+# storage it was opened on; an upload in any worker points the collection at
+# new storage, so a mismatch on lookup means the cached chain is stale.
+_rag_chains = OrderedDict()
+_rag_chains_lock = threading.Lock()
+
+def get_rag_chain(collection: str = DEFAULT_POLICY_COLLECTION):
+    storage_name, version = get_policy_storage(collection)
+    with _rag_chains_lock:
+        cached = _rag_chains.get(collection)
+        if cached and cached[0] == storage_name:
+            _rag_chains.move_to_end(collection)
+            return cached[1], version
+
+    if VECTOR_BACKEND == "numpy":
+        retriever = VectorIndexRetriever(index=VectorIndex(vector_index_path(storage_name)), embedding=embedding_model)
+    else:
+        vectorstore = Chroma(
+            collection_name=storage_name,
+            persist_directory=persist_directory,
+            embedding_function=embedding_model,
+            create_collection_if_not_exists=collection == DEFAULT_POLICY_COLLECTION and storage_name == collection,
+        )
+        retriever = vectorstore.as_retriever()
+    chain = create_retrieval_chain(retriever, qa_chain)
+
+    with _rag_chains_lock:
+        _rag_chains[collection] = (storage_name, chain)
+        _rag_chains.move_to_end(collection)
+        while len(_rag_chains) > POLICY_COLLECTION_CACHE_SIZE:
+            _rag_chains.popitem(last=False)
+    return chain, version
+
+def evict_policy_collection(collection: str):
+    with _rag_chains_lock:
+        _rag_chains.pop(collection, None)
+
+def evaluate_request(leave_request: str, collection: str = DEFAULT_POLICY_COLLECTION):
+    started = time.perf_counter()
+    with get_openai_callback() as usage:
+        try:
+            rag_chain, policy_version = get_rag_chain(collection)
+            response = rag_chain.invoke({"input": leave_request})
+        except (CollectionNotFoundError, FileNotFoundError):
+            # The storage was replaced and dropped by an upload between the
+            # lookup and the query; reopen on the current storage once.
+            evict_policy_collection(collection)
+            rag_chain, policy_version = get_rag_chain(collection)
+            response = rag_chain.invoke({"input": leave_request})
+    latency_ms = (time.perf_counter() - started) * 1000
 
     binary_result = None
     explanation = None
+    answer = None
     if response and "answer" in response:
         answer = response["answer"]
         if "Binary Result:" in answer and "Explanation:" in answer:
@@ -62,9 +117,28 @@ def handle_request(leave_request: str):
         else:
             explanation = "Output format does not match the expected format."
 
-    output = {
+    return {
         "output": binary_result,
-        "explanation": explanation
+        "explanation": explanation,
+        "answer": answer,
+        "context": [
+            {"page_content": doc.page_content, "metadata": doc.metadata}
+            for doc in (response or {}).get("context", [])
+        ],
+        "model": model_name,
+        "policy_collection": collection,
+        "policy_version": policy_version,
+        "latency_ms": latency_ms,
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+def handle_request(leave_request: str, collection: str = DEFAULT_POLICY_COLLECTION):
+    result = evaluate_request(leave_request, collection)
+    output = {
+        "output": result["output"],
+        "explanation": result["explanation"]
     }
     return json.dumps(output, indent=4)
 
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Query
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
-from schema import UserCreate, Token, UserResponse, LeaveCreate, LeaveResponse, RemainingLeaveCountResponse
-from services import get_password_hash, create_access_token, get_user, verify_password
-from utils import get_current_user
-from models import User, Leave, RemainingLeaveCount
+from starlette.concurrency import run_in_threadpool
+from schema import UserCreate, Token, UserResponse, LeaveCreate, LeaveResponse, RemainingLeaveCountResponse, LeaveRolloverRequest, LeaveAccrualRequest, LeaveBalanceJobResponse, PolicyAssignmentRequest, PolicyAssignmentResponse
+from services import get_password_hash, create_access_token, get_user, verify_password, get_policy_collection
+from utils import get_current_user, get_current_admin_user
+from models import User, Leave, RemainingLeaveCount, UserPolicyAssignment
 from database import get_db
-from fastapi.responses import JSONResponse
-from typing import List
-from rag_handler import handle_request 
-import json
-from vector_setup import vectorize_pdf
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
+from datetime import date
+from rag_handler import evaluate_request, evict_policy_collection
+from vector_setup import vectorize_pdf, validate_policy_collection, policy_collection_exists
 from pathlib import Path
+import uuid
+from leave_balances import run_rollover, run_accrual
+from leave_export import export_leaves, EXPORT_FORMATS
+from decision_audit import audit_writer, build_audit_entry
+from openai_client import get_client_metrics
+from embedding_cache import get_embedding_cache_stats
+from config import LEAVE_BALANCE_CHUNK_SIZE, DEFAULT_POLICY_COLLECTION
 
 router = APIRouter()
 
@@ -94,7 +102,7 @@ async def request_leave(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        rag_response = json.loads(handle_request(leave_data.reason))
+        rag_response = await run_in_threadpool(evaluate_request, leave_data.reason, get_policy_collection(db, current_user.id))
         
         if not rag_response or "output" not in rag_response:
             raise HTTPException(
@@ -102,7 +110,7 @@ async def request_leave(
                 detail="Error in processing leave request."
             )
         
-        status = "Approved" if rag_response["output"] == "1" else "Rejected"
+        leave_status = "Approved" if rag_response["output"] == "1" else "Rejected"
         explanation = rag_response.get("explanation", "No explanation provided.")
 
         if leave_data.leave_day_count <= 0:
@@ -118,14 +126,15 @@ async def request_leave(
             leave_day_count=leave_data.leave_day_count,
             leave_type=leave_data.leave_type,
             reason=leave_data.reason,
-            status=status,
+            status=leave_status,
             explanation=explanation
         )
         db.add(new_leave)
         db.commit()
         db.refresh(new_leave)
+        audit_writer.enqueue(build_audit_entry(new_leave, rag_response))
 
-        if status == "Approved":
+        if leave_status == "Approved":
             await update_remaining_leaves_auto(new_leave.id, db, current_user)
 
         return new_leave
@@ -211,20 +220,133 @@ async def get_user_leaves(
     return leaves
     
 @router.post("/upload-policy-pdf/")
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(
+    file: UploadFile = File(...),
+    collection: str = DEFAULT_POLICY_COLLECTION,
+    current_user: User = Depends(get_current_admin_user),
+):
     try:
         if not file.filename.endswith(".pdf"):
             raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+        try:
+            validate_policy_collection(collection)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        file_path = Path(f"temp_{file.filename}")
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-
-        result = vectorize_pdf(str(file_path))
+        file_path = Path(f"temp_{uuid.uuid4().hex}.pdf")
+        try:
+            with open(file_path, "wb") as f:
+                f.write(await file.read())
 
-        file_path.unlink()
+            result = await run_in_threadpool(vectorize_pdf, str(file_path), collection)
+            evict_policy_collection(collection)
+        finally:
+            file_path.unlink(missing_ok=True)
 
         return JSONResponse(content={"message": result})
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
-        return HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.post("/admin/leave-balances/rollover", response_model=LeaveBalanceJobResponse)
+def rollover_leave_balances(
+    job: LeaveRolloverRequest,
+    current_user: User = Depends(get_current_admin_user),
+):
+    try:
+        return run_rollover(
+            job.job_key,
+            entitlements=job.entitlements,
+            carry_over_caps=job.carry_over_caps,
+            chunk_size=LEAVE_BALANCE_CHUNK_SIZE if job.chunk_size is None else job.chunk_size,
+            dry_run=job.dry_run,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/admin/leave-balances/accrual", response_model=LeaveBalanceJobResponse)
+def accrue_leave_balances(
+    job: LeaveAccrualRequest,
+    current_user: User = Depends(get_current_admin_user),
+):
+    try:
+        return run_accrual(
+            job.job_key,
+            amounts=job.amounts,
+            max_balances=job.max_balances,
+            chunk_size=LEAVE_BALANCE_CHUNK_SIZE if job.chunk_size is None else job.chunk_size,
+            dry_run=job.dry_run,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/admin/leaves/export")
+def export_leave_records(
+    export_format: str = Query("csv", alias="format"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    leave_status: Optional[str] = Query(None, alias="status"),
+    leave_type: Optional[str] = None,
+    current_user: User = Depends(get_current_admin_user),
+):
+    try:
+        chunks = export_leaves(
+            export_format,
+            start_date=start_date,
+            end_date=end_date,
+            status=leave_status,
+            leave_type=leave_type,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="leaves.{export_format}"'},
+    )
+
+
+@router.put("/admin/users/{username}/policy", response_model=PolicyAssignmentResponse)
+def assign_user_policy(
+    username: str,
+    assignment: PolicyAssignmentRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    user = get_user(db, username=username)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {username} not found")
+
+    try:
+        validate_policy_collection(assignment.policy_collection)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not policy_collection_exists(assignment.policy_collection):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Policy collection {assignment.policy_collection} not found"
+        )
+
+    db_assignment = db.query(UserPolicyAssignment).filter(UserPolicyAssignment.user_id == user.id).first()
+    if db_assignment:
+        db_assignment.policy_collection = assignment.policy_collection
+    else:
+        db.add(UserPolicyAssignment(user_id=user.id, policy_collection=assignment.policy_collection))
+    db.commit()
+
+    return PolicyAssignmentResponse(username=user.username, policy_collection=assignment.policy_collection)
+
+
+@router.get("/admin/metrics")
+def get_metrics(current_user: User = Depends(get_current_admin_user)):
+    return {
+        "openai": get_client_metrics(),
+        "embedding_cache": get_embedding_cache_stats(),
+        "decision_audit": audit_writer.stats(),
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, Dict, Any
 from datetime import date
 
 class UserCreate(BaseModel):
@@ -57,3 +57,35 @@ class RemainingLeaveCountResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class LeaveRolloverRequest(BaseModel):
+    job_key: str
+    entitlements: Dict[str, int] = {}
+    carry_over_caps: Dict[str, Optional[int]] = {}
+    chunk_size: Optional[int] = None
+    dry_run: bool = False
+
+class LeaveAccrualRequest(BaseModel):
+    job_key: str
+    amounts: Dict[str, int]
+    max_balances: Dict[str, Optional[int]] = {}
+    chunk_size: Optional[int] = None
+    dry_run: bool = False
+
+class LeaveBalanceJobResponse(BaseModel):
+    job_key: str
+    job_type: str
+    rules: Dict[str, Any]
+    status: str
+    last_user_id: int
+    rows_updated: int
+    chunks: int = 0
+    dry_run: bool = False
+    diff: Optional[Dict[str, Any]] = None
+
+class PolicyAssignmentRequest(BaseModel):
+    policy_collection: str
+
+class PolicyAssignmentResponse(BaseModel):
+    username: str
+    policy_collection: str
@@ -1,9 +1,9 @@
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_DELTA
+from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_DELTA, DEFAULT_POLICY_COLLECTION
 from sqlalchemy.orm import Session
-from models import User
+from models import User, UserPolicyAssignment
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -22,3 +22,7 @@ def create_access_token(data: dict):
 
 def get_user(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
+
+def get_policy_collection(db: Session, user_id: int):
+    assignment = db.query(UserPolicyAssignment).filter(UserPolicyAssignment.user_id == user_id).first()
+    return assignment.policy_collection if assignment else DEFAULT_POLICY_COLLECTION
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# config and database read these at import time.
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault(
+    "SQLALCHEMY_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='leave-tests-'), 'app.db')}"
+)
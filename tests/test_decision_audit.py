@@ -0,0 +1,70 @@
+from datetime import date, datetime
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from database import Base
+from decision_audit import DecisionAuditWriter, audits
+
+
+def entry(leave_id, **overrides):
+    return {
+        "leave_id": leave_id,
+        "user_id": 1,
+        "created_at": datetime.utcnow(),
+        "leave_start_date": date(2026, 11, 1),
+        "leave_day_count": 1,
+        "leave_type": "Sick",
+        "reason": "I had an accident",
+        "decision": "Approved",
+        "status": "Approved",
+        "context": "[]",
+        "model": "gpt-3.5-turbo",
+        "policy_collection": "langchain",
+        "policy_version": "unversioned",
+        "latency_ms": 1.0,
+        **overrides,
+    }
+
+
+@pytest.fixture
+def bind(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def count(bind):
+    with bind.connect() as conn:
+        return conn.execute(select(func.count()).select_from(audits)).scalar()
+
+
+def test_retries_batch_after_transient_failure(bind, monkeypatch):
+    writer = DecisionAuditWriter(bind=bind, flush_interval=0.01)
+    insert = writer._insert
+    failures = iter([OperationalError("INSERT", {}, Exception("database is locked"))])
+
+    def flaky_insert(entries):
+        error = next(failures, None)
+        if error:
+            raise error
+        insert(entries)
+
+    monkeypatch.setattr(writer, "_insert", flaky_insert)
+    for leave_id in range(5):
+        writer.enqueue(entry(leave_id))
+    writer.flush()
+
+    assert count(bind) == 5
+    assert writer.stats()["written"] == 5
+    assert writer.stats()["failed"] == 0
+
+
+def test_bad_entry_does_not_drop_the_batch(bind):
+    writer = DecisionAuditWriter(bind=bind, flush_interval=0.01, write_retries=1)
+    for leave_id in range(5):
+        writer.enqueue(entry(leave_id))
+    writer.enqueue(entry(5, model=None))
+    writer.flush()
+
+    assert count(bind) == 5
+    assert writer.stats()["failed"] == 1
@@ -0,0 +1,43 @@
+import sqlite3
+import numpy as np
+import pytest
+from embedding_cache import EmbeddingCache
+
+
+class FailingInsert:
+    # Lets the eviction DELETE through and fails the INSERT of new entries,
+    # after put_many has already written the evicted slots.
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, *args):
+        return self.conn.execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        if sql.startswith("INSERT INTO entries"):
+            raise sqlite3.OperationalError("disk I/O error")
+        return self.conn.executemany(sql, *args)
+
+
+def vector(value):
+    return np.full(2, value, dtype=np.float32)
+
+
+def test_rolled_back_eviction_does_not_poison_slots(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path), "model", max_bytes=2 * 2 * 4)
+    cache.put_many({"a": vector(1), "b": vector(2)})
+
+    connection = cache._connection
+    monkeypatch.setattr(cache, "_connection", lambda: FailingInsert(connection()))
+    with pytest.raises(sqlite3.OperationalError):
+        cache.put_many({"z": vector(9)})
+    monkeypatch.undo()
+
+    found = cache.get_many(["a", "b", "z"])
+    assert set(found) == {"b"}
+    np.testing.assert_array_equal(found["b"], vector(2))
+
+    cache.put_many({"a": vector(1)})
+    np.testing.assert_array_equal(cache.get_many(["a"])["a"], vector(1))
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import create_engine, select
+import leave_balances
+from database import Base
+from leave_balances import balances, run_accrual, run_rollover
+
+USERS = 25
+
+
+@pytest.fixture
+def bind(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'balances.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(balances.insert(), [{"user_id": user_id} for user_id in range(1, USERS + 1)])
+    return engine
+
+
+def annual_leaves(bind):
+    with bind.connect() as conn:
+        return dict(conn.execute(select(balances.c.user_id, balances.c.annual_leaves)).all())
+
+
+def test_resumed_job_updates_every_user_once(bind, monkeypatch):
+    chunk_upper_bound = leave_balances._chunk_upper_bound
+    calls = 0
+
+    def crash_on_third_chunk(*args):
+        nonlocal calls
+        calls += 1
+        if calls == 3:
+            raise RuntimeError("worker died")
+        return chunk_upper_bound(*args)
+
+    monkeypatch.setattr(leave_balances, "_chunk_upper_bound", crash_on_third_chunk)
+    with pytest.raises(RuntimeError):
+        run_accrual("accrual-1", amounts={"Annual": 1}, chunk_size=10, bind=bind)
+    assert sorted(annual_leaves(bind).values()) == [14] * 5 + [15] * 20
+    monkeypatch.undo()
+
+    result = run_accrual("accrual-1", amounts={"Annual": 1}, chunk_size=10, bind=bind)
+    assert result["status"] == "Completed"
+    assert result["rows_updated"] == USERS
+    assert set(annual_leaves(bind).values()) == {15}
+
+    again = run_accrual("accrual-1", amounts={"Annual": 1}, chunk_size=10, bind=bind)
+    assert again["rows_updated"] == USERS
+    assert set(annual_leaves(bind).values()) == {15}
+
+
+def test_resume_with_different_rules_is_rejected(bind):
+    run_accrual("accrual-1", amounts={"Annual": 1}, bind=bind)
+
+    with pytest.raises(ValueError, match="different rules"):
+        run_accrual("accrual-1", amounts={"Annual": 2}, bind=bind)
+    with pytest.raises(ValueError, match="already exists as a Accrual job"):
+        run_rollover("accrual-1", bind=bind)
+    assert set(annual_leaves(bind).values()) == {15}
+
+
+def test_rollover_caps_carry_over(bind):
+    with bind.begin() as conn:
+        conn.execute(balances.update().where(balances.c.user_id == 1).values(annual_leaves=9))
+        conn.execute(balances.update().where(balances.c.user_id == 2).values(annual_leaves=3))
+
+    run_rollover("rollover-1", carry_over_caps={"Annual": 5}, bind=bind)
+
+    leaves = annual_leaves(bind)
+    assert leaves[1] == 5 + 14
+    assert leaves[2] == 3 + 14
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"entitlements": {"Annual": None}},
+        {"entitlements": {"Annual": -1}},
+        {"carry_over_caps": {"Holiday": 1}},
+        {"chunk_size": 0},
+    ],
+)
+def test_invalid_rollover_is_rejected(bind, kwargs):
+    with pytest.raises(ValueError):
+        run_rollover("rollover-1", bind=bind, **kwargs)
+    assert set(annual_leaves(bind).values()) == {14}
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from openai_client import ClientMetrics, ResilientTransport
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    # Each response is taken from server.script (status, delay) in order;
+    # once the script is empty every request succeeds immediately.
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.calls += 1
+            status, delay = self.server.script.pop(0) if self.server.script else (200, 0)
+        time.sleep(delay)
+        body = json.dumps({"status": status}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    server.lock = threading.Lock()
+    server.calls = 0
+    server.script = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, max_connections=4, **kwargs):
+    metrics = ClientMetrics(max_connections=max_connections)
+    transport = ResilientTransport(httpx.HTTPTransport(), metrics, backoff_base=0.01, backoff_max=0.05, **kwargs)
+    client = httpx.Client(transport=transport, base_url=f"http://127.0.0.1:{server.server_port}")
+    return client, metrics
+
+
+def test_retries_transient_errors(server):
+    server.script = [(503, 0), (429, 0)]
+    client, metrics = make_client(server, max_retries=3)
+
+    response = client.post("/v1/chat/completions", json={})
+
+    assert response.status_code == 200
+    assert server.calls == 3
+    assert metrics.retries == 2
+    assert metrics.retries_exhausted == 0
+
+
+def test_gives_up_after_max_retries(server):
+    server.script = [(503, 0)] * 5
+    client, metrics = make_client(server, max_retries=2)
+
+    response = client.post("/v1/chat/completions", json={})
+
+    assert response.status_code == 503
+    assert server.calls == 3
+    assert metrics.retries_exhausted == 1
+
+
+def test_stops_retrying_at_deadline(server):
+    server.script = [(503, 0)] * 50
+    client, metrics = make_client(server, max_retries=50, total_timeout=0.2)
+
+    started = time.monotonic()
+    response = client.post("/v1/chat/completions", json={})
+
+    assert response.status_code == 503
+    assert time.monotonic() - started < 1
+    assert metrics.retries_exhausted == 1
+
+
+def test_hedges_slow_request(server):
+    client, metrics = make_client(server, hedge=True, hedge_min_samples=3, hedge_budget=1)
+    for _ in range(5):
+        client.post("/v1/chat/completions", json={})
+
+    hedges_sent, hedges_won = metrics.hedges_sent, metrics.hedges_won
+    server.script = [(200, 1)]
+    started = time.monotonic()
+    response = client.post("/v1/chat/completions", json={})
+
+    assert response.status_code == 200
+    assert time.monotonic() - started < 0.5
+    assert metrics.hedges_sent == hedges_sent + 1
+    assert metrics.hedges_won == hedges_won + 1
+
+
+def test_latency_is_tracked_per_endpoint(server):
+    client, metrics = make_client(server, hedge=True, hedge_min_samples=3)
+    for _ in range(5):
+        client.post("/v1/chat/completions", json={})
+
+    assert metrics.p95("/v1/chat/completions", 3) is not None
+    assert metrics.p95("/v1/embeddings", 3) is None
+    assert list(metrics.snapshot()["p95_latency_ms"]) == ["/v1/chat/completions"]
+
+    # Without embedding samples there is no hedge threshold for that endpoint.
+    server.script = [(200, 0.3)]
+    client.post("/v1/embeddings", json={})
+    assert metrics.hedges_sent == 0
+
+
+def test_concurrent_hedging_respects_deadline_and_budget(server):
+    client, metrics = make_client(server, max_connections=100, hedge=True, hedge_min_samples=3, total_timeout=1)
+    for _ in range(20):
+        client.post("/v1/chat/completions", json={})
+
+    server.script = [(200, 0.5)] * 40
+
+    def call(_):
+        started = time.monotonic()
+        client.post("/v1/chat/completions", json={})
+        return time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        durations = list(pool.map(call, range(40)))
+
+    assert max(durations) < 1.2
+    # 20 warm-up and 40 concurrent requests earn 0.1 of a hedge each.
+    assert metrics.hedges_sent <= 6
@@ -2,7 +2,7 @@ from fastapi import Depends, HTTPException, status
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer
-from config import SECRET_KEY, ALGORITHM
+from config import SECRET_KEY, ALGORITHM, ADMIN_USERNAMES
 from database import get_db
 from models import User
 from services import get_user
@@ -26,3 +26,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     if user is None:
         raise credentials_exception
     return user
+
+async def get_current_admin_user(current_user: User = Depends(get_current_user)):
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
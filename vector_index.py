@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import uuid
+from typing import Any, List
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# Small policy corpora fit in one contiguous matrix: rows are L2-normalised
+# chunk vectors (optionally int8 with a per-row scale), stored as .npy files
+# that are memory-mapped on load so worker processes share the same pages.
+
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+DOCUMENTS_FILE = "documents.json"
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def write_vector_index(directory: str, documents: List[Document], embedding, quantize: bool = False):
+    # Every upload writes to a fresh versioned directory and the collection is
+    # only pointed at it afterwards, so an existing index is never replaced.
+    if not documents:
+        raise ValueError("Cannot build a vector index without documents")
+    if os.path.exists(directory):
+        raise FileExistsError(f"Vector index {directory} already exists")
+    vectors = np.asarray(embedding.embed_documents([doc.page_content for doc in documents]), dtype=np.float32)
+    vectors = _normalize(vectors.reshape(len(documents), -1))
+
+    staging = f"{directory}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    try:
+        if quantize:
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1
+            np.save(os.path.join(staging, VECTORS_FILE), np.round(vectors / scales[:, None]).astype(np.int8))
+            np.save(os.path.join(staging, SCALES_FILE), scales.astype(np.float32))
+        else:
+            np.save(os.path.join(staging, VECTORS_FILE), vectors)
+        with open(os.path.join(staging, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+            json.dump([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents], f)
+        os.rename(staging, directory)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+class VectorIndex:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.scales = None
+
+        vectors_path = os.path.join(directory, VECTORS_FILE)
+        if not os.path.exists(vectors_path):
+            raise FileNotFoundError(f"No vector index at {directory}; the policy must be uploaded with VECTOR_BACKEND=numpy")
+        self.vectors = np.load(vectors_path, mmap_mode="r")
+        scales_path = os.path.join(directory, SCALES_FILE)
+        if os.path.exists(scales_path):
+            self.scales = np.load(scales_path)
+        with open(os.path.join(directory, DOCUMENTS_FILE), encoding="utf-8") as f:
+            self.documents = [Document(**doc) for doc in json.load(f)]
+
+    def search(self, query_vector, k: int = 4):
+        query = _normalize(np.asarray(query_vector, dtype=np.float32))
+        scores = self.vectors @ query
+        if self.scales is not None:
+            scores *= self.scales
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+
+class VectorIndexRetriever(BaseRetriever):
+    index: Any
+    embedding: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.index.search(self.embedding.embed_query(query), self.k)]
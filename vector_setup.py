@@ -1,9 +1,17 @@
+import hashlib
 import os
+import re
+import shutil
+import uuid
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+from openai_client import get_embeddings
+from vector_index import write_vector_index
+from config import DEFAULT_POLICY_COLLECTION, VECTOR_BACKEND, VECTOR_INDEX_QUANTIZE
+from database import SessionLocal
+from models import PolicyCollection
 
 load_dotenv()
 
@@ -13,22 +21,115 @@ if not openai_api_key:
 
 os.environ["OPENAI_API_KEY"] = openai_api_key
 
-def vectorize_pdf(file_path: str):
+persist_directory = "vectorstore_data"
+unversioned_policy = "unversioned"
+vector_index_directory = "vectorindex_data"
 
+POLICY_COLLECTION_PATTERN = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9._-]{1,61}[a-zA-Z0-9]$")
+
+def validate_policy_collection(collection: str):
+    if not POLICY_COLLECTION_PATTERN.match(collection) or ".." in collection:
+        raise ValueError(
+            "Policy collection must be 3-63 characters of letters, digits, '.', '_' or '-', "
+            "and start and end with a letter or digit."
+        )
+    return collection
+
+def vector_index_path(collection: str):
+    return os.path.join(vector_index_directory, collection)
+
+def get_policy_storage(collection: str):
+    # Uploaded policies are stored under a fresh storage name per upload and
+    # the collection key points at the current one, together with the hash of
+    # the uploaded file as its version. Collections that predate the mapping
+    # (e.g. Chroma's default "langchain") use the key itself and no version.
+    db = SessionLocal()
     try:
+        record = db.query(PolicyCollection).filter(PolicyCollection.collection_key == collection).first()
+        if record:
+            return record.storage_name, record.version
+        return collection, unversioned_policy
+    finally:
+        db.close()
+
+def _storage_exists(storage_name: str):
+    if VECTOR_BACKEND == "numpy":
+        return os.path.isdir(vector_index_path(storage_name))
+    try:
+        Chroma(
+            collection_name=storage_name,
+            persist_directory=persist_directory,
+            create_collection_if_not_exists=False,
+        )
+        return True
+    except Exception:
+        return False
+
+def _drop_storage(storage_name: str):
+    if VECTOR_BACKEND == "numpy":
+        shutil.rmtree(vector_index_path(storage_name), ignore_errors=True)
+    elif _storage_exists(storage_name):
+        Chroma(collection_name=storage_name, persist_directory=persist_directory).delete_collection()
+
+def policy_collection_exists(collection: str):
+    # The default collection is what unassigned users are evaluated against,
+    # so it can always be assigned even before a policy was uploaded to it.
+    return collection == DEFAULT_POLICY_COLLECTION or _storage_exists(get_policy_storage(collection)[0])
+
+def _point_collection_at(collection: str, storage_name: str, version: str):
+    db = SessionLocal()
+    try:
+        record = db.query(PolicyCollection).filter(PolicyCollection.collection_key == collection).first()
+        previous = record.storage_name if record else collection
+        if record:
+            record.storage_name = storage_name
+            record.version = version
+        else:
+            db.add(PolicyCollection(collection_key=collection, storage_name=storage_name, version=version))
+        db.commit()
+        return previous
+    finally:
+        db.close()
+
+def vectorize_pdf(file_path: str, collection: str = DEFAULT_POLICY_COLLECTION):
+    validate_policy_collection(collection)
+
+    try:
+        with open(file_path, "rb") as f:
+            version = hashlib.sha256(f.read()).hexdigest()
+
         loader = PyPDFLoader(file_path)  
         docs = loader.load()
 
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=50)
         splits = text_splitter.split_documents(docs)
+        if not splits:
+            raise ValueError("No text could be extracted from the PDF")
 
-        embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
-        vectorstore = Chroma.from_documents(documents=splits, embedding=embedding_model)
+        embedding_model = get_embeddings("text-embedding-3-small")
 
-        persist_directory = "vectorstore_data"
-        vectorstore.persist()  
-        vectorstore = Chroma(persist_directory=persist_directory)
+        # Embed into a new storage first and only switch the collection over
+        # once that succeeded, so a failed upload leaves the old policy live.
+        storage_name = f"policy-{uuid.uuid4().hex}"
+        try:
+            if VECTOR_BACKEND == "numpy":
+                os.makedirs(vector_index_directory, exist_ok=True)
+                write_vector_index(
+                    vector_index_path(storage_name), splits, embedding_model, quantize=VECTOR_INDEX_QUANTIZE
+                )
+            else:
+                Chroma.from_documents(
+                    documents=splits,
+                    embedding=embedding_model,
+                    collection_name=storage_name,
+                    persist_directory=persist_directory,
+                )
+            previous = _point_collection_at(collection, storage_name, version)
+        except Exception:
+            _drop_storage(storage_name)
+            raise
 
-        return "Vectorstore created and saved successfully!"
+        _drop_storage(previous)
+        return f"Policy collection '{collection}' version {version[:12]} created and saved successfully!"
     except Exception as e:
         raise Exception(f"Error during vectorization: {str(e)}")